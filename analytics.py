@@ -0,0 +1,351 @@
+import asyncio
+import os
+import logging
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "analytics_daily"
+STAGING_COLLECTION = "analytics_daily_staging"
+META_COLLECTION = "analytics_meta"
+BACKFILL_ID = "backfill"
+ANALYTICS_BACKFILL_LOCK_TIMEOUT = float(os.getenv("ANALYTICS_BACKFILL_LOCK_TIMEOUT", "900"))
+ANALYTICS_CHECK_INTERVAL = float(os.getenv("ANALYTICS_CHECK_INTERVAL", "3600"))
+
+TOTAL = "total"
+# $merge rejects null `on` fields, so totals and missing values get sentinels
+TOTAL_VALUE = "all"
+UNKNOWN_VALUE = "unknown"
+ROLLUP_KEY = ["metric", "dimension", "day", "value"]
+
+# Metric -> source collection, timestamp field and the dimensions we roll up
+METRICS: Dict[str, Dict[str, Any]] = {
+    "contacts": {
+        "collection": "contacts",
+        "date_field": "created_at",
+        "dimensions": []
+    },
+    "inquiries": {
+        "collection": "inquiries",
+        "date_field": "created_at",
+        "dimensions": ["business_type", "budget", "template_id"]
+    },
+    "newsletter": {
+        "collection": "newsletter",
+        "date_field": "subscribed_at",
+        "dimensions": []
+    }
+}
+
+INTERVALS = {"day": 10, "month": 7}  # length of the YYYY-MM-DD prefix to group on
+
+
+class BackfillClaimLost(Exception):
+    """Another process took over the backfill claim while we were running"""
+
+
+class AnalyticsService:
+    """
+    Maintains one rollup document per (metric, dimension, day, value) in
+    `analytics_daily`. Writes bump the rollups incrementally; `backfill`
+    rebuilds them from the raw collections with an aggregation pipeline.
+
+    Only one process runs a backfill at a time: it claims the `backfill`
+    document in `analytics_meta` with its own owner token, refreshes
+    `claimed_at` between steps and builds into its own staging collection, so
+    a process taking over an abandoned claim never touches a live run's data.
+    The same document records completed runs and any scheduled follow-up.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.rollups = db[ROLLUP_COLLECTION]
+        self.meta = db[META_COLLECTION]
+        self._task: Optional[asyncio.Task] = None
+        self._backfill_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Build the rollups in the background on first boot and when a follow-up is due"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._backfill_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._backfill_task = None
+
+    async def _run(self):
+        while True:
+            await self.backfill_if_needed()
+            await asyncio.sleep(ANALYTICS_CHECK_INTERVAL)
+
+    async def ensure_indexes(self):
+        await self.rollups.create_index([(field, ASCENDING) for field in ROLLUP_KEY], unique=True)
+
+    async def trigger_backfill(self) -> bool:
+        """Start a rebuild in the background; False if one is already running"""
+        owner = await self._claim_backfill(force=True)
+        if owner is None:
+            return False
+        self._backfill_task = asyncio.create_task(self._run_backfill(owner))
+        return True
+
+    async def backfill_if_needed(self):
+        try:
+            await self.ensure_indexes()
+            owner = await self._claim_backfill(force=False)
+            if owner is not None:
+                await self._run_backfill(owner)
+        except Exception as e:
+            logger.error(f"Analytics backfill failed: {e}")
+
+    async def _claim_backfill(self, force: bool) -> Optional[str]:
+        """Returns this run's owner token, or None if the claim is held elsewhere"""
+        now = datetime.utcnow()
+        owner = uuid.uuid4().hex
+        claim = {"status": "running", "claimed_at": now, "owner": owner}
+        try:
+            result = await self.meta.update_one(
+                {"_id": BACKFILL_ID},
+                {"$setOnInsert": claim},
+                upsert=True
+            )
+            if result.upserted_id is not None:
+                return owner
+        except DuplicateKeyError:
+            pass  # another replica inserted it first
+
+        # Take over a failed or abandoned run or a due follow-up; any finished one on request
+        stale = now - timedelta(seconds=ANALYTICS_BACKFILL_LOCK_TIMEOUT)
+        claimable = [
+            {"status": "failed"},
+            {"status": "running", "claimed_at": {"$lt": stale}},
+            {"status": "done", "next_run_at": {"$lte": now}}
+        ]
+        if force:
+            claimable.append({"status": "done"})
+        claimed = await self.meta.find_one_and_update(
+            {"_id": BACKFILL_ID, "$or": claimable},
+            {"$set": claim}
+        )
+        return owner if claimed is not None else None
+
+    async def _heartbeat(self, owner: str):
+        result = await self.meta.update_one(
+            {"_id": BACKFILL_ID, "owner": owner, "status": "running"},
+            {"$set": {"claimed_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            raise BackfillClaimLost(owner)
+
+    async def _release(self, owner: str, fields: Dict[str, Any]):
+        try:
+            await self.meta.update_one({"_id": BACKFILL_ID, "owner": owner}, {"$set": fields})
+        except Exception as e:
+            logger.error(f"Could not release analytics backfill claim: {e}")
+
+    async def _run_backfill(self, owner: str):
+        try:
+            previous = await self.meta.find_one({"_id": BACKFILL_ID})
+            first_run = not (previous and previous.get("completed_at"))
+            await self.backfill(owner, include_today=first_run)
+        except asyncio.CancelledError:
+            # Shutting down: free the claim instead of holding it until it goes stale
+            await self._release(owner, {"status": "failed"})
+            raise
+        except BackfillClaimLost:
+            logger.warning("Analytics backfill claim taken over by another process, aborting")
+            return
+        except Exception as e:
+            logger.error(f"Analytics backfill failed: {e}")
+            await self._release(owner, {"status": "failed"})
+            return
+
+        now = datetime.utcnow()
+        done = {"status": "done", "completed_at": now, "next_run_at": None}
+        if first_run:
+            # Today was counted from raw data while writes kept landing;
+            # once it is a past day, rebuild it from raw data again
+            tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            done["next_run_at"] = tomorrow
+        await self._release(owner, done)
+
+    async def record(self, metric: str, doc: Dict[str, Any]):
+        """Count a newly written document in today's rollups"""
+        config = METRICS[metric]
+        day = doc[config["date_field"]].strftime("%Y-%m-%d")
+
+        keys = [(TOTAL, TOTAL_VALUE)] + [
+            (dim, UNKNOWN_VALUE if doc.get(dim) is None else doc.get(dim))
+            for dim in config["dimensions"]
+        ]
+        await self.rollups.bulk_write([
+            UpdateOne(
+                {"metric": metric, "dimension": dimension, "day": day, "value": value},
+                {"$inc": {"count": 1}},
+                upsert=True
+            )
+            for dimension, value in keys
+        ], ordered=False)
+
+    async def backfill(self, owner: Optional[str] = None, include_today: bool = False):
+        """
+        Rebuild the rollups into a staging collection and swap it in.
+
+        Past days are recomputed from the raw collections, so rollups of
+        deleted documents disappear. Today's rollups are still being bumped by
+        `record()`, so they are normally copied over from the live collection;
+        increments landing between that copy and the rename are lost.
+
+        With `include_today` (the first backfill, when the live rollups hold
+        nothing from before this deploy) today is counted from the raw data up
+        to the start of the run instead, and writes during the run are lost
+        until the follow-up rebuild.
+        """
+        started = datetime.utcnow()
+        today = started.replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff = started if include_today else today
+
+        staging_name = f"{STAGING_COLLECTION}_{owner or uuid.uuid4().hex}"
+        staging = self.db[staging_name]
+
+        async def heartbeat():
+            if owner is not None:
+                await self._heartbeat(owner)
+
+        try:
+            await staging.create_index([(field, ASCENDING) for field in ROLLUP_KEY], unique=True)
+
+            for metric, config in METRICS.items():
+                for dimension in [TOTAL] + config["dimensions"]:
+                    await heartbeat()
+                    pipeline = self._backfill_pipeline(metric, config, dimension, cutoff, staging_name)
+                    await self.db[config["collection"]].aggregate(pipeline).to_list(None)
+
+            if not include_today:
+                await heartbeat()
+                await self.rollups.aggregate([
+                    {"$match": {"day": {"$gte": today.strftime("%Y-%m-%d")}}},
+                    {"$project": {"_id": 0}},
+                    {"$merge": {"into": staging_name, "on": ROLLUP_KEY, "whenMatched": "replace", "whenNotMatched": "insert"}}
+                ]).to_list(None)
+
+            await heartbeat()
+            await staging.rename(ROLLUP_COLLECTION, dropTarget=True)
+        finally:
+            # No-op after a successful rename
+            try:
+                await staging.drop()
+            except Exception as e:
+                logger.error(f"Could not drop {staging_name}: {e}")
+        logger.info("Analytics backfill complete")
+
+    def _backfill_pipeline(
+        self,
+        metric: str,
+        config: Dict[str, Any],
+        dimension: str,
+        before: datetime,
+        into: str
+    ) -> List[Dict[str, Any]]:
+        if dimension == TOTAL:
+            value = {"$literal": TOTAL_VALUE}
+        else:
+            value = {"$ifNull": [f"${dimension}", UNKNOWN_VALUE]}
+        return [
+            {"$match": {config["date_field"]: {"$type": "date", "$lt": before}}},
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${config['date_field']}"}},
+                    "value": value
+                },
+                "count": {"$sum": 1}
+            }},
+            {"$project": {
+                "_id": 0,
+                "metric": {"$literal": metric},
+                "dimension": {"$literal": dimension},
+                "day": "$_id.day",
+                "value": "$_id.value",
+                "count": 1
+            }},
+            {"$merge": {
+                "into": into,
+                "on": ROLLUP_KEY,
+                "whenMatched": "fail",
+                "whenNotMatched": "insert"
+            }}
+        ]
+
+    async def query(
+        self,
+        metric: str,
+        start: date,
+        end: date,
+        group_by: Optional[str] = None,
+        interval: str = "day"
+    ) -> Dict[str, Any]:
+        """Time series (and per-value totals when grouped) read from the rollups"""
+        dimension = group_by or TOTAL
+        match = {
+            "metric": metric,
+            "dimension": dimension,
+            "day": {"$gte": start.isoformat(), "$lte": end.isoformat()}
+        }
+        period = {"$substrBytes": ["$day", 0, INTERVALS[interval]]}
+
+        series_pipeline = [
+            {"$match": match},
+            {"$group": {"_id": {"period": period, "value": "$value"}, "count": {"$sum": "$count"}}},
+            {"$sort": {"_id.period": 1}}
+        ]
+        rows = await self.rollups.aggregate(series_pipeline).to_list(None)
+
+        result: Dict[str, Any] = {
+            "metric": metric,
+            "group_by": group_by,
+            "interval": interval,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "total": sum(row["count"] for row in rows)
+        }
+
+        if group_by:
+            groups: Dict[Any, int] = {}
+            series = []
+            for row in rows:
+                value = row["_id"]["value"]
+                groups[value] = groups.get(value, 0) + row["count"]
+                series.append({"period": row["_id"]["period"], "value": value, "count": row["count"]})
+            result["groups"] = [
+                {"value": value, "count": count}
+                for value, count in sorted(groups.items(), key=lambda item: item[1], reverse=True)
+            ]
+            result["series"] = series
+            return result
+
+        # Running total from the beginning of time, e.g. subscriber growth
+        cumulative = await self._count_before(metric, start)
+        series = []
+        for row in rows:
+            cumulative += row["count"]
+            series.append({"period": row["_id"]["period"], "count": row["count"], "cumulative": cumulative})
+        result["series"] = series
+        return result
+
+    async def _count_before(self, metric: str, start: date) -> int:
+        rows = await self.rollups.aggregate([
+            {"$match": {"metric": metric, "dimension": TOTAL, "day": {"$lt": start.isoformat()}}},
+            {"$group": {"_id": None, "count": {"$sum": "$count"}}}
+        ]).to_list(None)
+        return rows[0]["count"] if rows else 0
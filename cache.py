@@ -0,0 +1,61 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+
+
+class ResponseCache:
+    """
+    Per-process LRU cache for read endpoints. Keys are "<namespace>:<rest>" so
+    a whole namespace can be dropped when its source collection changes.
+
+    Readers take `generation(key)` before querying Mongo and pass it to `set`;
+    if the namespace was invalidated in the meantime the result is not stored.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def generation(self, key: str) -> Tuple[int, int]:
+        return (self._epoch, self._generations.get(self._namespace(key), 0))
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, generation: Optional[Tuple[int, int]] = None, ttl: Optional[float] = None):
+        if generation is not None and generation != self.generation(key):
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: str):
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        prefix = f"{namespace}:"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._epoch += 1
+        self._entries.clear()
@@ -1,5 +1,7 @@
+import asyncio
 import resend
 import os
+import time
 from typing import Dict, Any
 from dotenv import load_dotenv
 
@@ -8,6 +10,60 @@ load_dotenv()
 resend.api_key = os.getenv("RESEND_API_KEY")
 FROM_EMAIL = os.getenv("RESEND_FROM_EMAIL", "contact@x67digital.com")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "contact@x67digital.com")
+EMAIL_FAILURE_THRESHOLD = int(os.getenv("EMAIL_FAILURE_THRESHOLD", "5"))
+EMAIL_RESET_TIMEOUT = float(os.getenv("EMAIL_RESET_TIMEOUT", "60"))
+
+
+class CircuitBreaker:
+    """Stops calling the email transport after repeated failures"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half_open":
+            # Let a single trial call through; everyone else waits for its result
+            self.opened_at = time.monotonic()
+            return True
+        return state == "closed"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+circuit_breaker = CircuitBreaker(EMAIL_FAILURE_THRESHOLD, EMAIL_RESET_TIMEOUT)
+
+
+async def _send(params: Dict[str, Any]):
+    """Send through Resend, guarded by the circuit breaker"""
+    if not circuit_breaker.allow():
+        raise RuntimeError("Email transport circuit is open")
+    try:
+        # resend is a blocking HTTP client; keep it off the event loop
+        email = await asyncio.to_thread(resend.Emails.send, params)
+    except Exception:
+        circuit_breaker.record_failure()
+        raise
+    circuit_breaker.record_success()
+    return email
 
 
 class EmailService:
@@ -46,7 +102,7 @@ class EmailService:
                 """
             }
             
-            email = resend.Emails.send(params)
+            email = await _send(params)
             return True
         except Exception as e:
             print(f"Error sending contact notification: {e}")
@@ -105,7 +161,7 @@ class EmailService:
                 """
             }
             
-            email = resend.Emails.send(params)
+            email = await _send(params)
             return True
         except Exception as e:
             print(f"Error sending confirmation email: {e}")
@@ -172,7 +228,7 @@ class EmailService:
                 """
             }
             
-            email = resend.Emails.send(params)
+            email = await _send(params)
             return True
         except Exception as e:
             print(f"Error sending welcome email: {e}")
@@ -210,7 +266,7 @@ class EmailService:
                 """
             }
             
-            email = resend.Emails.send(params)
+            email = await _send(params)
             return True
         except Exception as e:
             print(f"Error sending inquiry notification: {e}")
@@ -256,7 +312,7 @@ class EmailService:
                 """
             }
             
-            email = resend.Emails.send(params)
+            email = await _send(params)
             return True
         except Exception as e:
             print(f"Error sending inquiry confirmation: {e}")
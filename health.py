@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from email_service import circuit_breaker
+
+logger = logging.getLogger(__name__)
+
+HEALTH_REFRESH_INTERVAL = float(os.getenv("HEALTH_REFRESH_INTERVAL", "10"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+HEALTH_MAX_DB_LATENCY_MS = float(os.getenv("HEALTH_MAX_DB_LATENCY_MS", "1000"))
+HEALTH_MAX_LOOP_LAG_MS = float(os.getenv("HEALTH_MAX_LOOP_LAG_MS", "500"))
+HEALTH_LOOP_TICK = float(os.getenv("HEALTH_LOOP_TICK", "0.5"))
+
+# Email failures are shared by every replica and requests still succeed without
+# it, so an open circuit only marks the service degraded
+CRITICAL_CHECKS = ("database", "event_loop")
+
+
+class HealthMonitor:
+    """
+    Refreshes dependency probes in the background and caches the result,
+    so health endpoints never touch MongoDB themselves
+    """
+
+    def __init__(self, db, interval: float = HEALTH_REFRESH_INTERVAL):
+        self.db = db
+        self.interval = interval
+        self.snapshot: Dict[str, Any] = {
+            "status": "starting",
+            "ready": False,
+            "checks": {},
+            "checked_at": None
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._lag_task: Optional[asyncio.Task] = None
+        self._max_loop_lag_ms = 0.0
+
+    async def start(self):
+        """Run the first probe before serving traffic, then keep refreshing"""
+        await self.refresh()
+        self._lag_task = asyncio.create_task(self._measure_loop_lag())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._lag_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._lag_task = None
+
+    async def _measure_loop_lag(self):
+        # Sleep overshoot on a short tick shows how long the loop was blocked;
+        # keep the worst value until the next refresh reports it
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(HEALTH_LOOP_TICK)
+            lag_ms = (time.monotonic() - started - HEALTH_LOOP_TICK) * 1000
+            self._max_loop_lag_ms = max(self._max_loop_lag_ms, lag_ms)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh failed: {e}")
+
+    async def refresh(self):
+        checks = {
+            "database": await self._check_database(),
+            "email": self._check_email(),
+            "event_loop": self._check_event_loop()
+        }
+        ready = all(checks[name]["healthy"] for name in CRITICAL_CHECKS)
+
+        if not ready:
+            overall = "unhealthy"
+        elif all(check["healthy"] for check in checks.values()):
+            overall = "healthy"
+        else:
+            overall = "degraded"
+
+        self.snapshot = {
+            "status": overall,
+            "ready": ready,
+            "checks": checks,
+            "checked_at": datetime.utcnow().isoformat()
+        }
+
+    async def _check_database(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.db.command("ping"), timeout=HEALTH_PROBE_TIMEOUT)
+        except Exception as e:
+            return {"healthy": False, "status": "disconnected", "error": str(e) or type(e).__name__}
+
+        latency_ms = round((time.monotonic() - started) * 1000, 2)
+        return {
+            "healthy": latency_ms <= HEALTH_MAX_DB_LATENCY_MS,
+            "status": "connected",
+            "latency_ms": latency_ms
+        }
+
+    def _check_email(self) -> Dict[str, Any]:
+        state = circuit_breaker.state
+        return {
+            "healthy": state != "open",
+            "circuit": state,
+            "consecutive_failures": circuit_breaker.failures
+        }
+
+    def _check_event_loop(self) -> Dict[str, Any]:
+        lag_ms = round(self._max_loop_lag_ms, 2)
+        self._max_loop_lag_ms = 0.0
+        return {
+            "healthy": lag_ms <= HEALTH_MAX_LOOP_LAG_MS,
+            "lag_ms": lag_ms
+        }
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", "5"))
+INVALIDATION_RETRY_DELAY = float(os.getenv("INVALIDATION_RETRY_DELAY", "5"))
+
+# Source collection -> cache namespaces built from it
+WATCHED_COLLECTIONS: Dict[str, List[str]] = {
+    "blog_posts": ["blog"],
+    "projects": ["projects", "stats"],
+    "contacts": ["stats"],
+    "inquiries": ["stats"],
+    "newsletter": ["stats"]
+}
+
+# Server error codes
+NOT_REPLICA_SET = 40573
+CHANGE_STREAM_FATAL = 280
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+class CacheInvalidator:
+    """
+    Tails MongoDB change streams on the watched collections and drops the
+    affected cache namespaces, so edits made through any replica (or directly
+    in Mongo) reach every process. The resume token is kept in memory: the
+    cache it protects is per process, so after a restart there is nothing to
+    resume into.
+
+    Standalone mongod has no change streams; there we poll `updated_at` and
+    document counts instead.
+    """
+
+    def __init__(self, db, cache: ResponseCache, poll_interval: float = INVALIDATION_POLL_INTERVAL):
+        self.db = db
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.mode = "stopped"
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.mode = "stopped"
+
+    def invalidate_collection(self, collection: str):
+        for namespace in WATCHED_COLLECTIONS.get(collection, []):
+            self.cache.invalidate(namespace)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._watch()
+            except OperationFailure as e:
+                if e.code == NOT_REPLICA_SET:
+                    logger.info("Change streams unavailable, falling back to polling")
+                    break
+                if e.code in (CHANGE_STREAM_FATAL, CHANGE_STREAM_HISTORY_LOST):
+                    # Token fell off the oplog: anything may have changed since
+                    logger.warning(f"Resume token no longer valid, restarting change stream: {e}")
+                    self._resume_token = None
+                else:
+                    logger.error(f"Change stream failed: {e}")
+                    await asyncio.sleep(INVALIDATION_RETRY_DELAY)
+            except PyMongoError as e:
+                logger.error(f"Change stream failed: {e}")
+                await asyncio.sleep(INVALIDATION_RETRY_DELAY)
+            except Exception as e:
+                # Never let the task die: caches would then go stale for the full TTL
+                logger.exception(f"Unexpected change stream error: {e}")
+                await asyncio.sleep(INVALIDATION_RETRY_DELAY)
+
+        await self._poll()
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}}}]
+
+        async with self.db.watch(pipeline, resume_after=self._resume_token) as stream:
+            self.mode = "change_stream"
+            if self._resume_token is None:
+                # No resume point, so we may have missed changes while down
+                self.cache.clear()
+            async for change in stream:
+                collection = change.get("ns", {}).get("coll")
+                if collection:
+                    self.invalidate_collection(collection)
+                else:
+                    # drop/dropDatabase/invalidate events have no collection
+                    self.cache.clear()
+                self._resume_token = stream.resume_token
+
+    async def _poll(self):
+        self.mode = "polling"
+        for name in WATCHED_COLLECTIONS:
+            try:
+                await self.db[name].create_index("updated_at")
+            except PyMongoError as e:
+                logger.error(f"Could not index {name}.updated_at: {e}")
+
+        # Unknown state counts as changed, so the first successful poll
+        # (or one after a failed snapshot) also clears the namespace
+        state: Dict[str, Optional[Tuple[Optional[datetime], int]]] = {name: None for name in WATCHED_COLLECTIONS}
+
+        while True:
+            for name in WATCHED_COLLECTIONS:
+                try:
+                    current = await self._poll_state(name)
+                except Exception as e:
+                    logger.error(f"Cache poll failed for {name}: {e}")
+                    continue
+                if current != state[name]:
+                    self.invalidate_collection(name)
+                    state[name] = current
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll_state(self, name: str) -> Tuple[Optional[datetime], int]:
+        # The count catches inserts and deletes on collections without updated_at
+        collection = self.db[name]
+        latest = await collection.find_one(
+            {"updated_at": {"$exists": True}},
+            sort=[("updated_at", -1)],
+            projection={"updated_at": 1}
+        )
+        count = await collection.estimated_document_count()
+        return (latest["updated_at"] if latest else None, count)
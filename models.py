@@ -94,6 +94,7 @@ class Project(BaseModel):
     completed_at: Optional[datetime] = None
     featured: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 # Response Models
@@ -1,8 +1,10 @@
 from fastapi import FastAPI, APIRouter, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from pathlib import Path
+from datetime import date, datetime, timedelta
 import os
 import logging
 
@@ -13,6 +15,10 @@ from models import (
     MessageResponse, BlogPost, Project
 )
 from email_service import EmailService
+from health import HealthMonitor
+from cache import ResponseCache
+from invalidation import CacheInvalidator
+from analytics import AnalyticsService, METRICS, INTERVALS
 
 # Setup
 ROOT_DIR = Path(__file__).parent
@@ -27,6 +33,16 @@ db = client[db_name]
 # Initialize EmailService
 email_service = EmailService()
 
+# Background dependency probes for health endpoints
+health_monitor = HealthMonitor(db)
+
+# Read cache for blog/projects/stats, kept fresh across replicas via change streams
+response_cache = ResponseCache()
+cache_invalidator = CacheInvalidator(db, response_cache)
+
+# Daily rollups for admin analytics
+analytics_service = AnalyticsService(db)
+
 # Create app
 app = FastAPI(title="X67 Digital API", version="2.0")
 api_router = APIRouter(prefix="/api")
@@ -49,6 +65,12 @@ async def create_contact(contact_data: ContactCreate):
         
         # Save to database
         await db.contacts.insert_one(contact.dict())
+        cache_invalidator.invalidate_collection("contacts")
+        
+        try:
+            await analytics_service.record("contacts", contact.dict())
+        except Exception as e:
+            logger.error(f"Analytics update failed: {e}")
         
         # Send email notifications (async fire-and-forget)
         try:
@@ -104,8 +126,9 @@ async def subscribe_newsletter(subscriber_data: NewsletterSubscribe):
                 # Reactivate subscription
                 await db.newsletter.update_one(
                     {"email": subscriber_data.email},
-                    {"$set": {"is_active": True}}
+                    {"$set": {"is_active": True, "updated_at": datetime.utcnow()}}
                 )
+                cache_invalidator.invalidate_collection("newsletter")
                 return NewsletterResponse(
                     message="Abonamentul tău a fost reactivat cu succes!",
                     success=True
@@ -114,6 +137,12 @@ async def subscribe_newsletter(subscriber_data: NewsletterSubscribe):
         # Create new subscriber
         subscriber = Newsletter(**subscriber_data.dict())
         await db.newsletter.insert_one(subscriber.dict())
+        cache_invalidator.invalidate_collection("newsletter")
+        
+        try:
+            await analytics_service.record("newsletter", subscriber.dict())
+        except Exception as e:
+            logger.error(f"Analytics update failed: {e}")
         
         # Send welcome email
         try:
@@ -159,6 +188,12 @@ async def create_inquiry(inquiry_data: TemplateInquiryCreate):
         
         # Save to database
         await db.inquiries.insert_one(inquiry.dict())
+        cache_invalidator.invalidate_collection("inquiries")
+        
+        try:
+            await analytics_service.record("inquiries", inquiry.dict())
+        except Exception as e:
+            logger.error(f"Analytics update failed: {e}")
         
         # Send email notifications
         try:
@@ -197,6 +232,12 @@ async def get_inquiries(limit: int = 50):
 @api_router.get("/blog/posts")
 async def get_blog_posts(limit: int = 10, skip: int = 0, category: str = None):
     """Get published blog posts"""
+    cache_key = f"blog:posts:{limit}:{skip}:{category}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = response_cache.generation(cache_key)
+    
     try:
         query = {"published": True}
         if category:
@@ -205,7 +246,9 @@ async def get_blog_posts(limit: int = 10, skip: int = 0, category: str = None):
         posts = await db.blog_posts.find(query).sort("published_at", -1).skip(skip).limit(limit).to_list(limit)
         total = await db.blog_posts.count_documents(query)
         
-        return {"posts": posts, "total": total}
+        result = {"posts": posts, "total": total}
+        response_cache.set(cache_key, result, generation=generation)
+        return result
     except Exception as e:
         logger.error(f"Error fetching blog posts: {e}")
         raise HTTPException(status_code=500, detail="Error fetching blog posts")
@@ -214,10 +257,17 @@ async def get_blog_posts(limit: int = 10, skip: int = 0, category: str = None):
 @api_router.get("/blog/posts/{slug}")
 async def get_blog_post(slug: str):
     """Get single blog post by slug"""
+    cache_key = f"blog:post:{slug}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = response_cache.generation(cache_key)
+    
     try:
         post = await db.blog_posts.find_one({"slug": slug, "published": True})
         if not post:
             raise HTTPException(status_code=404, detail="Post not found")
+        response_cache.set(cache_key, post, generation=generation)
         return post
     except HTTPException:
         raise
@@ -231,6 +281,12 @@ async def get_blog_post(slug: str):
 @api_router.get("/projects")
 async def get_projects(limit: int = 20, featured: bool = None, category: str = None):
     """Get projects"""
+    cache_key = f"projects:list:{limit}:{featured}:{category}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = response_cache.generation(cache_key)
+    
     try:
         query = {}
         if featured is not None:
@@ -239,7 +295,9 @@ async def get_projects(limit: int = 20, featured: bool = None, category: str = N
             query["category"] = category
         
         projects = await db.projects.find(query).sort("completed_at", -1).limit(limit).to_list(limit)
-        return {"projects": projects, "total": len(projects)}
+        result = {"projects": projects, "total": len(projects)}
+        response_cache.set(cache_key, result, generation=generation)
+        return result
     except Exception as e:
         logger.error(f"Error fetching projects: {e}")
         raise HTTPException(status_code=500, detail="Error fetching projects")
@@ -248,10 +306,17 @@ async def get_projects(limit: int = 20, featured: bool = None, category: str = N
 @api_router.get("/projects/{slug}")
 async def get_project(slug: str):
     """Get single project by slug"""
+    cache_key = f"projects:item:{slug}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = response_cache.generation(cache_key)
+    
     try:
         project = await db.projects.find_one({"slug": slug})
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
+        response_cache.set(cache_key, project, generation=generation)
         return project
     except HTTPException:
         raise
@@ -265,23 +330,75 @@ async def get_project(slug: str):
 @api_router.get("/stats")
 async def get_stats():
     """Get overall statistics"""
+    cache_key = "stats:overall"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = response_cache.generation(cache_key)
+    
     try:
         total_contacts = await db.contacts.count_documents({})
         total_subscribers = await db.newsletter.count_documents({"is_active": True})
         total_inquiries = await db.inquiries.count_documents({})
         total_projects = await db.projects.count_documents({})
         
-        return {
+        result = {
             "contacts": total_contacts,
             "newsletter_subscribers": total_subscribers,
             "template_inquiries": total_inquiries,
             "projects": total_projects
         }
+        response_cache.set(cache_key, result, generation=generation)
+        return result
     except Exception as e:
         logger.error(f"Error fetching stats: {e}")
         raise HTTPException(status_code=500, detail="Error fetching stats")
 
 
+# ============= ANALYTICS ENDPOINTS =============
+
+@api_router.get("/analytics")
+async def get_analytics(
+    metric: str,
+    group_by: str = None,
+    start: date = None,
+    end: date = None,
+    interval: str = "day"
+):
+    """Time-range and group-by counts from the daily rollups (Admin endpoint)"""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric, expected one of: {', '.join(METRICS)}")
+    if group_by and group_by not in METRICS[metric]["dimensions"]:
+        raise HTTPException(status_code=400, detail=f"Cannot group {metric} by {group_by}")
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unknown interval, expected one of: {', '.join(INTERVALS)}")
+    
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    try:
+        return await analytics_service.query(metric, start, end, group_by=group_by, interval=interval)
+    except Exception as e:
+        logger.error(f"Error fetching analytics: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching analytics")
+
+
+@api_router.post("/analytics/backfill", response_model=MessageResponse, status_code=status.HTTP_202_ACCEPTED)
+async def backfill_analytics():
+    """Rebuild the daily rollups from the raw collections in the background (Admin endpoint)"""
+    try:
+        started = await analytics_service.trigger_backfill()
+    except Exception as e:
+        logger.error(f"Error starting analytics backfill: {e}")
+        raise HTTPException(status_code=500, detail="Error starting analytics backfill")
+    
+    if not started:
+        raise HTTPException(status_code=409, detail="Analytics backfill already running")
+    return MessageResponse(message="Analytics backfill started")
+
+
 # Root endpoint
 @api_router.get("/")
 async def root():
@@ -294,20 +411,31 @@ async def root():
             "inquiries": "/api/inquiries",
             "blog": "/api/blog/posts",
             "projects": "/api/projects",
-            "stats": "/api/stats"
+            "stats": "/api/stats",
+            "analytics": "/api/analytics",
+            "health": "/api/health/ready"
         }
     }
 
 
-# Health check
+# Health checks
+@api_router.get("/health/live")
+async def liveness_check():
+    """Process is up and the event loop is serving requests"""
+    return {"status": "alive"}
+
+
+@api_router.get("/health/ready")
+async def readiness_check():
+    """Cached dependency probes; 503 tells the load balancer to route elsewhere"""
+    snapshot = health_monitor.snapshot
+    status_code = status.HTTP_200_OK if snapshot["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=snapshot)
+
+
 @api_router.get("/health")
 async def health_check():
-    try:
-        # Check MongoDB connection
-        await db.command("ping")
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
+    return await readiness_check()
 
 
 # Include router
@@ -322,9 +450,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Startup
+@app.on_event("startup")
+async def start_health_monitor():
+    await health_monitor.start()
+
+
+@app.on_event("startup")
+async def start_cache_invalidator():
+    cache_invalidator.start()
+
+
+@app.on_event("startup")
+async def start_analytics():
+    analytics_service.start()
+
+
 # Shutdown
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await health_monitor.stop()
+    await cache_invalidator.stop()
+    await analytics_service.stop()
     client.close()
 
 
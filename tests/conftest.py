@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules live at the repo root, next to server.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
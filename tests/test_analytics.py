@@ -0,0 +1,362 @@
+"""
+Backfill scenarios run against a real mongod (>= 4.2 for $merge); set
+TEST_MONGO_URL to point elsewhere than localhost, they are skipped if it is
+unreachable. Claim transitions and query shaping use in-memory fakes.
+"""
+import asyncio
+import os
+import uuid
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import analytics  # noqa: E402
+from analytics import AnalyticsService, ROLLUP_COLLECTION, TOTAL, TOTAL_VALUE, UNKNOWN_VALUE  # noqa: E402
+
+TEST_MONGO_URL = os.getenv("TEST_MONGO_URL", "mongodb://localhost:27017")
+
+
+def run(test):
+    """Run `test(db)` against a throwaway database"""
+    motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+    async def main():
+        client = motor_asyncio.AsyncIOMotorClient(TEST_MONGO_URL, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except Exception:
+            client.close()
+            pytest.skip(f"mongod not reachable at {TEST_MONGO_URL}")
+
+        db_name = f"x67_test_{uuid.uuid4().hex[:8]}"
+        try:
+            await test(client[db_name])
+        finally:
+            await client.drop_database(db_name)
+            client.close()
+
+    asyncio.run(main())
+
+
+def inquiry(created_at, **fields):
+    doc = {
+        "id": str(uuid.uuid4()),
+        "business_type": "restaurant",
+        "budget": "1000-3000",
+        "template_id": None,
+        "created_at": created_at
+    }
+    doc.update(fields)
+    return doc
+
+
+def test_backfill_builds_rollups_with_sentinels():
+    async def scenario(db):
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        await db.contacts.insert_many([{"created_at": yesterday}, {"created_at": yesterday}])
+        await db.inquiries.insert_many([
+            inquiry(yesterday),
+            inquiry(yesterday, template_id="t-1"),
+            inquiry(yesterday, business_type="shop")
+        ])
+
+        service = AnalyticsService(db)
+        await service.ensure_indexes()
+        await service.backfill()
+
+        day = yesterday.date()
+        contacts = await service.query("contacts", day, day)
+        assert contacts["total"] == 2
+
+        by_template = await service.query("inquiries", day, day, group_by="template_id")
+        groups = {group["value"]: group["count"] for group in by_template["groups"]}
+        assert groups == {UNKNOWN_VALUE: 2, "t-1": 1}
+
+        total_doc = await db[ROLLUP_COLLECTION].find_one({"metric": "inquiries", "dimension": TOTAL})
+        assert total_doc["value"] == TOTAL_VALUE
+        assert total_doc["count"] == 3
+
+    run(scenario)
+
+
+def test_backfill_drops_stale_rollups_and_keeps_today():
+    async def scenario(db):
+        now = datetime.utcnow()
+        yesterday = now - timedelta(days=1)
+        await db.inquiries.insert_one(inquiry(yesterday, budget="old"))
+
+        service = AnalyticsService(db)
+        await service.ensure_indexes()
+        await service.backfill()
+
+        # Source row changes and today's write only goes through record()
+        await db.inquiries.update_one({}, {"$set": {"budget": "new"}})
+        await service.record("inquiries", inquiry(now))
+        await service.backfill()
+        await service.record("inquiries", inquiry(now))
+
+        by_budget = await service.query("inquiries", yesterday.date(), now.date(), group_by="budget")
+        groups = {group["value"]: group["count"] for group in by_budget["groups"]}
+        assert groups == {"new": 1, "1000-3000": 2}
+
+    run(scenario)
+
+
+def test_backfill_claim_is_exclusive():
+    async def scenario(db):
+        service = AnalyticsService(db)
+        other = AnalyticsService(db)
+
+        owner = await service._claim_backfill(force=False)
+        assert owner
+        assert not await other._claim_backfill(force=False)
+        assert not await other._claim_backfill(force=True)
+
+        await service._run_backfill(owner)
+        assert not await other._claim_backfill(force=False)
+        assert await other._claim_backfill(force=True)
+
+    run(scenario)
+
+
+def test_first_backfill_counts_today_from_raw_data():
+    async def scenario(db):
+        now = datetime.utcnow()
+        await db.newsletter.insert_many([{"subscribed_at": now}, {"subscribed_at": now - timedelta(days=2)}])
+
+        service = AnalyticsService(db)
+        await service.ensure_indexes()
+        owner = await service._claim_backfill(force=False)
+        await service._run_backfill(owner)
+
+        growth = await service.query("newsletter", now.date(), now.date())
+        assert growth["total"] == 1
+        assert growth["series"][-1]["cumulative"] == 2
+
+        meta = await db.analytics_meta.find_one({"_id": "backfill"})
+        assert meta["status"] == "done"
+        assert meta["next_run_at"] > now
+
+    run(scenario)
+
+
+def test_lost_claim_aborts_without_touching_rollups():
+    async def scenario(db):
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        await db.contacts.insert_one({"created_at": yesterday})
+
+        service = AnalyticsService(db)
+        await service.ensure_indexes()
+        await service.record("contacts", {"created_at": yesterday})
+
+        owner = await service._claim_backfill(force=False)
+        await db.analytics_meta.update_one({"_id": "backfill"}, {"$set": {"owner": "someone-else"}})
+        await service._run_backfill(owner)
+
+        assert await db[ROLLUP_COLLECTION].count_documents({}) == 1
+        names = await db.list_collection_names()
+        assert not [name for name in names if name.startswith("analytics_daily_staging")]
+
+    run(scenario)
+
+
+# ============= WITHOUT MONGOD =============
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, option) for option in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+            if "$lte" in condition and not (value is not None and value <= condition["$lte"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeMeta:
+    """Just enough of a collection for the claim document"""
+
+    def __init__(self):
+        self.doc = None
+
+    async def update_one(self, query, update, upsert=False):
+        if self.doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, upserted_id=None)
+            self.doc = {"_id": query["_id"], **update.get("$setOnInsert", {}), **update.get("$set", {})}
+            return SimpleNamespace(matched_count=0, upserted_id=query["_id"])
+        if not matches(self.doc, query):
+            return SimpleNamespace(matched_count=0, upserted_id=None)
+        self.doc.update(update.get("$set", {}))
+        return SimpleNamespace(matched_count=1, upserted_id=None)
+
+    async def find_one_and_update(self, query, update):
+        if self.doc is None or not matches(self.doc, query):
+            return None
+        before = dict(self.doc)
+        self.doc.update(update["$set"])
+        return before
+
+    async def find_one(self, query):
+        return dict(self.doc) if self.doc else None
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length):
+        return self.rows
+
+
+class FakeRollups:
+    """Returns canned aggregation output: series rows, or the count before `start`"""
+
+    def __init__(self, rows, before=0):
+        self.rows = rows
+        self.before = before
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        if pipeline[1]["$group"]["_id"] is None:
+            return FakeCursor([{"_id": None, "count": self.before}] if self.before else [])
+        return FakeCursor(self.rows)
+
+
+def fake_service(meta=None, rollups=None):
+    service = AnalyticsService.__new__(AnalyticsService)
+    service.db = None
+    service.meta = meta or FakeMeta()
+    service.rollups = rollups
+    service._task = None
+    service._backfill_task = None
+    return service
+
+
+def claim(service, force=False):
+    return asyncio.run(service._claim_backfill(force=force))
+
+
+def test_claim_transitions():
+    meta = FakeMeta()
+    first, second = fake_service(meta), fake_service(meta)
+
+    owner = claim(first)
+    assert owner and meta.doc["owner"] == owner
+    assert claim(second) is None
+    assert claim(second, force=True) is None  # running claims are never forced
+
+    meta.doc["status"] = "done"
+    assert claim(second) is None
+    other = claim(second, force=True)
+    assert other and other != owner
+
+    meta.doc["status"] = "failed"
+    assert claim(first)
+
+
+def test_stale_running_claim_can_be_taken_over():
+    meta = FakeMeta()
+    service = fake_service(meta)
+    claim(service)
+
+    meta.doc["claimed_at"] = datetime.utcnow() - timedelta(seconds=analytics.ANALYTICS_BACKFILL_LOCK_TIMEOUT + 1)
+    assert claim(fake_service(meta))
+
+
+def test_due_follow_up_is_claimable_without_force():
+    meta = FakeMeta()
+    service = fake_service(meta)
+    claim(service)
+
+    meta.doc.update(status="done", next_run_at=datetime.utcnow() + timedelta(hours=1))
+    assert claim(service) is None
+
+    meta.doc["next_run_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert claim(service)
+
+
+def test_heartbeat_fails_once_claim_is_lost():
+    meta = FakeMeta()
+    service = fake_service(meta)
+    owner = claim(service)
+
+    asyncio.run(service._heartbeat(owner))
+    meta.doc["owner"] = "someone-else"
+    with pytest.raises(analytics.BackfillClaimLost):
+        asyncio.run(service._heartbeat(owner))
+
+
+def test_run_backfill_records_outcome(monkeypatch):
+    meta = FakeMeta()
+    service = fake_service(meta)
+    calls = []
+
+    async def backfill(owner=None, include_today=False):
+        calls.append(include_today)
+
+    monkeypatch.setattr(service, "backfill", backfill)
+
+    asyncio.run(service._run_backfill(claim(service)))
+    assert meta.doc["status"] == "done"
+    assert meta.doc["next_run_at"] > datetime.utcnow()  # first run schedules a follow-up
+
+    asyncio.run(service._run_backfill(claim(service, force=True)))
+    assert meta.doc["next_run_at"] is None
+    assert calls == [True, False]
+
+    async def failing(owner=None, include_today=False):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "backfill", failing)
+    asyncio.run(service._run_backfill(claim(service, force=True)))
+    assert meta.doc["status"] == "failed"
+
+
+def test_query_totals_with_cumulative_series():
+    rollups = FakeRollups([
+        {"_id": {"period": "2026-10-01", "value": TOTAL_VALUE}, "count": 2},
+        {"_id": {"period": "2026-10-02", "value": TOTAL_VALUE}, "count": 3}
+    ], before=10)
+    service = fake_service(rollups=rollups)
+
+    result = asyncio.run(service.query("newsletter", date(2026, 10, 1), date(2026, 10, 2)))
+
+    assert result["total"] == 5
+    assert result["series"] == [
+        {"period": "2026-10-01", "count": 2, "cumulative": 12},
+        {"period": "2026-10-02", "count": 3, "cumulative": 15}
+    ]
+    match = rollups.pipelines[0][0]["$match"]
+    assert match == {"metric": "newsletter", "dimension": TOTAL, "day": {"$gte": "2026-10-01", "$lte": "2026-10-02"}}
+
+
+def test_query_grouped_orders_groups_by_count():
+    rollups = FakeRollups([
+        {"_id": {"period": "2026-10", "value": "shop"}, "count": 1},
+        {"_id": {"period": "2026-10", "value": "restaurant"}, "count": 4},
+        {"_id": {"period": "2026-11", "value": "shop"}, "count": 5}
+    ])
+    service = fake_service(rollups=rollups)
+
+    result = asyncio.run(service.query(
+        "inquiries", date(2026, 10, 1), date(2026, 11, 30), group_by="business_type", interval="month"
+    ))
+
+    assert result["total"] == 10
+    assert result["groups"] == [{"value": "shop", "count": 6}, {"value": "restaurant", "count": 4}]
+    assert result["series"][0] == {"period": "2026-10", "value": "shop", "count": 1}
+    assert "cumulative" not in result["series"][0]
+    assert len(rollups.pipelines) == 1
+    group = rollups.pipelines[0][1]["$group"]
+    assert group["_id"]["period"] == {"$substrBytes": ["$day", 0, 7]}
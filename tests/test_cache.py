@@ -0,0 +1,77 @@
+from cache import ResponseCache
+
+
+def test_set_and_get():
+    cache = ResponseCache()
+    cache.set("blog:posts:10", {"posts": []})
+    assert cache.get("blog:posts:10") == {"posts": []}
+    assert cache.get("blog:posts:20") is None
+
+
+def test_expired_entries_are_dropped():
+    cache = ResponseCache()
+    cache.set("blog:a", 1, ttl=0)
+    assert cache.get("blog:a") is None
+
+
+def test_invalidate_drops_only_its_namespace():
+    cache = ResponseCache()
+    cache.set("blog:a", 1)
+    cache.set("stats:overall", 2)
+
+    cache.invalidate("blog")
+
+    assert cache.get("blog:a") is None
+    assert cache.get("stats:overall") == 2
+
+
+def test_set_skipped_when_namespace_invalidated_during_query():
+    cache = ResponseCache()
+    generation = cache.generation("blog:a")
+
+    cache.invalidate("blog")  # change event lands while the query is in flight
+    cache.set("blog:a", "stale", generation=generation)
+
+    assert cache.get("blog:a") is None
+
+
+def test_set_skipped_after_clear_during_query():
+    cache = ResponseCache()
+    generation = cache.generation("stats:overall")
+
+    cache.clear()
+    cache.set("stats:overall", "stale", generation=generation)
+
+    assert cache.get("stats:overall") is None
+
+
+def test_other_namespace_invalidation_does_not_block_set():
+    cache = ResponseCache()
+    generation = cache.generation("blog:a")
+
+    cache.invalidate("projects")
+    cache.set("blog:a", "fresh", generation=generation)
+
+    assert cache.get("blog:a") == "fresh"
+
+
+def test_lru_bound_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("blog:a", 1)
+    cache.set("blog:b", 2)
+    cache.get("blog:a")  # a is now more recent than b
+
+    cache.set("blog:c", 3)
+
+    assert cache.get("blog:a") == 1
+    assert cache.get("blog:b") is None
+    assert cache.get("blog:c") == 3
+
+
+def test_lru_bound_holds_under_many_keys():
+    cache = ResponseCache(max_entries=10)
+    for skip in range(1000):
+        cache.set(f"blog:posts:10:{skip}:None", skip)
+
+    assert len(cache._entries) == 10
+    assert cache.get("blog:posts:10:999:None") == 999
@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+import email_service
+import health
+from email_service import CircuitBreaker
+from health import HealthMonitor
+
+
+class FakeDb:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def command(self, name):
+        if self.error:
+            raise self.error
+        return {"ok": 1}
+
+
+def refresh(monitor):
+    asyncio.run(monitor.refresh())
+    return monitor.snapshot
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(health, "circuit_breaker", breaker)
+    monkeypatch.setattr(email_service, "circuit_breaker", breaker)
+    return breaker
+
+
+def open_and_expire(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+
+
+# ============= CIRCUIT BREAKER =============
+
+def test_circuit_opens_after_threshold(breaker):
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_admits_a_single_trial(breaker):
+    open_and_expire(breaker)
+    assert breaker.state == "half_open"
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+
+def test_half_open_trial_success_closes(breaker):
+    open_and_expire(breaker)
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_half_open_trial_failure_reopens(breaker):
+    open_and_expire(breaker)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_send_runs_off_the_event_loop(breaker, monkeypatch):
+    def blocking_send(params):
+        time.sleep(0.2)
+        return {"id": "sent"}
+
+    monkeypatch.setattr(email_service.resend.Emails, "send", blocking_send)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await email_service._send({"to": ["a@example.com"]})
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result == {"id": "sent"}
+    assert ticks > 5
+
+
+def test_send_rejected_while_open(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(email_service._send({}))
+
+
+# ============= HEALTH MONITOR =============
+
+def test_healthy_when_all_checks_pass(breaker):
+    snapshot = refresh(HealthMonitor(FakeDb()))
+
+    assert snapshot["status"] == "healthy"
+    assert snapshot["ready"] is True
+    assert snapshot["checks"]["database"]["status"] == "connected"
+
+
+def test_open_email_circuit_is_degraded_but_ready(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+
+    snapshot = refresh(HealthMonitor(FakeDb()))
+
+    assert snapshot["status"] == "degraded"
+    assert snapshot["ready"] is True
+    assert snapshot["checks"]["email"]["circuit"] == "open"
+
+
+def test_database_failure_is_not_ready(breaker):
+    snapshot = refresh(HealthMonitor(FakeDb(error=ConnectionError("refused"))))
+
+    assert snapshot["status"] == "unhealthy"
+    assert snapshot["ready"] is False
+    assert snapshot["checks"]["database"]["error"] == "refused"
+
+
+def test_loop_lag_reported_once_then_reset(breaker):
+    monitor = HealthMonitor(FakeDb())
+    monitor._max_loop_lag_ms = health.HEALTH_MAX_LOOP_LAG_MS + 1
+
+    snapshot = refresh(monitor)
+    assert snapshot["ready"] is False
+    assert snapshot["checks"]["event_loop"]["healthy"] is False
+
+    snapshot = refresh(monitor)
+    assert snapshot["ready"] is True
+    assert snapshot["checks"]["event_loop"]["lag_ms"] == 0
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from cache import ResponseCache  # noqa: E402
+from invalidation import CacheInvalidator, WATCHED_COLLECTIONS  # noqa: E402
+
+
+class FakeCollection:
+    async def create_index(self, keys):
+        return keys
+
+
+class FakeDb:
+    def __getitem__(self, name):
+        return FakeCollection()
+
+
+def poll_rounds(invalidator, states):
+    """
+    Run `_poll` with blog_posts reporting one entry of `states` per round (an
+    Exception instance means that poll fails); other collections never change.
+    The blog entry is re-cached before each round; returns what each round
+    left behind.
+    """
+    rounds = iter(states)
+    seen = []
+
+    async def poll_state(name):
+        if name != "blog_posts":
+            return (None, 1)
+        seen.append(invalidator.cache.get("blog:a"))
+        invalidator.cache.set("blog:a", "cached")
+        try:
+            state = next(rounds)
+        except StopIteration:
+            raise asyncio.CancelledError
+        if isinstance(state, Exception):
+            raise state
+        return state
+
+    invalidator._poll_state = poll_state
+    invalidator.poll_interval = 0
+
+    async def scenario():
+        try:
+            await invalidator._poll()
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    # First entry is the state before any poll ran
+    return seen[1:]
+
+
+def make_invalidator():
+    cache = ResponseCache()
+    cache.set("blog:a", "cached")
+    return CacheInvalidator(FakeDb(), cache)
+
+
+def test_first_poll_clears_unknown_state():
+    seen = poll_rounds(make_invalidator(), [(None, 3)])
+    assert seen == [None]
+
+
+def test_unchanged_state_keeps_cache():
+    seen = poll_rounds(make_invalidator(), [(None, 3), (None, 3)])
+    assert seen == [None, "cached"]
+
+
+def test_changed_state_clears_namespace():
+    seen = poll_rounds(make_invalidator(), [(None, 3), (None, 4), ("t1", 4)])
+    assert seen == [None, None, None]
+
+
+def test_failed_poll_is_retried_on_next_round():
+    seen = poll_rounds(make_invalidator(), [RuntimeError("timeout"), (None, 3), (None, 3)])
+    assert seen == ["cached", None, "cached"]
+
+
+def test_stats_invalidated_by_every_source_collection():
+    for name, namespaces in WATCHED_COLLECTIONS.items():
+        if name != "blog_posts":
+            assert "stats" in namespaces